@@ -1,9 +1,36 @@
 """ This is the main class for html document generation """
+import functools
+import re
 import yattag
-from html.parser import HTMLParser
+from html import escape as _escape
+
+# matches a start or end tag, group 1 is "/" for end tags and group 2 is the tag name.
+# quoted attribute values may contain ">". "<" is not allowed anywhere inside a tag, so
+# a "<" without a closing ">" is only scanned up to the next "<", keeping the scan linear
+_TAG_RE = re.compile(r"""<(/?)([a-zA-Z][^\s/<>]*)(?:[^<>"']|"[^"<]*"|'[^'<]*')*>""")
+# elements whose content is raw text, only their literal end tag closes them
+_RAW_TEXT_END_RE = {tag: re.compile(r"</" + tag + r"\s*>", re.IGNORECASE)
+                    for tag in ('script', 'style', 'textarea')}
 
 selfClosingTags = ["area", "base", "br", "col", "embed", "hr", "img", "input", "link",
                    "meta", "param", "source", "track", "wbr"]
+_SELF_CLOSING = frozenset(selfClosingTags)
+# html tags which are allowed inside a paragraph tag according to the HTML specification
+_DEFAULT_KEEP_TAGS = frozenset(['a', 'abbr', 'area', 'audio', 'b', 'bdi', 'bdo', 'br',
+                                'button', 'canvas', 'cite', 'code', 'data', 'datalist',
+                                'del', 'dfn', 'em', 'embed', 'i', 'iframe', 'img', 'input',
+                                'ins', 'kbd', 'label', 'link', 'map', 'mark', 'math', 'meta',
+                                'meter', 'noscript', 'object', 'output', 'picture', 'progress',
+                                'q', 'ruby', 's', 'samp', 'script', 'select', 'slot', 'small',
+                                'span', 'strong', 'sub', 'sup', 'svg', 'template', 'text',
+                                'textarea', 'time', 'u', 'var', 'video', 'wbr'])
+
+# longest paragraph text which is cached, see paragraph
+_PARAGRAPH_CACHE_MAX_LEN = 256
+
+# html document structure, body items are added between the two parts
+_DOC_START_TEMPLATE = "<!DOCTYPE html><html><head><title>{title}</title>{head}</head><body>{h1}"
+_DOC_END = "</body></html>"
 
 # TODO add option to add to document head, for example to add css or js
 # TODO add option to generate table of contents/menu based on sections added to the document
@@ -25,6 +52,8 @@ class HtmlDoc:
         - title: document title
     """
 
+    __slots__ = ('headItems', 'sections', 'bodyItems', 'title', 'indentText')
+
     def __init__(self, title="htmlDoc", indentText=False):
         """ initiates a document 
 
@@ -47,7 +76,7 @@ class HtmlDoc:
         self.indentText = indentText
         
 
-    def addSection(self, title, level=1, id=None, atr=[]):
+    def addSection(self, title, level=1, id=None, atr=()):
         """ adds a section to the document
 
         Parameters:
@@ -70,7 +99,7 @@ class HtmlDoc:
 
         return sec
 
-    def addText(self, text, atr=[], allAsText=False, allAsIs=False):
+    def addText(self, text, atr=(), allAsText=False, allAsIs=False):
         """ Adds text to the document, this will be inside a html paragraph tag
     
         Parameters:
@@ -91,48 +120,54 @@ class HtmlDoc:
         Returns: html code equivalent of the document
         """
 
-        doc, tag, text = yattag.Doc().tagtext()
-
-        doc.asis('<!DOCTYPE html>')
-        with tag('html'):
-            with tag('head'):
-                with tag('title'):
-                    text(self.title)
-                for item in self.headItems:
-                    doc.asis(item)
-            with tag('body'):
-                # Add document title as h1 heading
-                doc.asis(heading(self.title, level=1, indentText=self.indentText))
-                # add body items, which include sections and other html code
-                for item in self.bodyItems:
-                    if isinstance(item, str):
-                        # treat as html generated text already
-                        doc.asis(item)
-                    else:
-                        # assume this is a class from this module, use generateHtml method
-                        doc.asis(item.generateHtml())
+        return ''.join(self.iterHtml())
 
-        result = yattag.indent(
-        doc.getvalue(),
-        indent_text = self.indentText
-        )
+    def iterHtml(self):
+        """ Generates the document html code in chunks, one for each body item.
+            Each chunk is indented as part of the whole document
 
-        return result
+        Returns: generator of html code strings which together make up the document
+        """
+
+        # the document structure up to the body items never changes, so fill it in from a template.
+        # Add document title as h1 heading
+        start = _DOC_START_TEMPLATE.format(
+            title=_escape(str(self.title), quote=False),
+            head=''.join(self.headItems),
+            h1=heading(self.title, level=1))
+        # the last two lines are the closing body and html tags
+        lines = yattag.indent(start + _DOC_END, indent_text = self.indentText).split('\n')
+        yield '\n'.join(lines[:-2])
+        # add body items, which include sections and other html code.
+        # each is indented separately so the whole document is never held in memory
+        for item in self.bodyItems:
+            if isinstance(item, str):
+                # treat as html generated text already
+                code = item
+            else:
+                # assume this is a class from this module, use generateHtml method
+                code = item.generateHtml()
+            code = _indentBodyItem(code, self.indentText)
+            if code:
+                yield '\n' + code
+        yield '\n' + '\n'.join(lines[-2:])
     
     def saveFile(self, filename=None):
         """ saves the document as an html file
 
         Parameters:
             - filename (optional): name of the file to save. If not provided, title will be used with .html extension
+                The file is always saved with utf-8 encoding
         """
 
         if filename is None:
             filename = self.title + ".html"
 
-        htmlCode = self.generateHtml()
-
-        with open(filename, 'w') as f:
-            f.write(htmlCode)
+        # write chunks as they are generated, rather than building the whole document first
+        # utf-8 is used regardless of platform default, with a large buffer so many
+        # small chunks are written in few system calls
+        with open(filename, 'w', encoding='utf-8', buffering=1 << 20, newline='\n') as f:
+            f.writelines(self.iterHtml())
     
 class Section:
     """ Class for a section of the html document 
@@ -145,7 +180,9 @@ class Section:
         - title: title for the section, this will be displayed in a heading tag in the HTML
     """
 
-    def __init__(self, title, level=1, id=None, atr=[], indentText=False):
+    __slots__ = ('title', 'level', 'id', 'atr', 'indentText', 'subsections', 'htmlCode')
+
+    def __init__(self, title, level=1, id=None, atr=(), indentText=False):
         """ Creates a section object
 
         Parameters:
@@ -164,7 +201,7 @@ class Section:
             self.id = title
         else:
             self.id = str(id)
-        self.atr = atr
+        self.atr = _atrTuple(atr)
         self.indentText = indentText
         
         # list of subsections added to section
@@ -172,7 +209,7 @@ class Section:
         # list of html code added to the section. This also includes location of subsections
         self.htmlCode = []
 
-    def addOrderedList(self, items, atr=[], indentText=False, allAsText=False, allAsIs=False):
+    def addOrderedList(self, items, atr=(), indentText=False, allAsText=False, allAsIs=False):
         """ adds an ordered list to the section
 
         Parameters:
@@ -192,7 +229,7 @@ class Section:
         code = orderedList(items, atr=atr, indentText=indentText, allAsText=allAsText, allAsIs=allAsIs)
         self.htmlCode.append(code)
 
-    def addSubsection(self, title, id=None, atr=[]):
+    def addSubsection(self, title, id=None, atr=()):
         """adds a subsection one level lower than this section
 
         Parameters
@@ -208,7 +245,7 @@ class Section:
     
         return sub
     
-    def addText(self, text, atr=[], allAsText=False, allAsIs=False):
+    def addText(self, text, atr=(), allAsText=False, allAsIs=False):
         """ Adds text to the section, this will be inside a html paragraph tag
     
         Parameters:
@@ -224,7 +261,7 @@ class Section:
         code = paragraph(text, atr, self.indentText, allAsText=allAsText, allAsIs=allAsIs)
         self.htmlCode.append(code)
         
-    def addUnorderedList(self, items, atr=[], indentText=False, allAsText=False, allAsIs=False):
+    def addUnorderedList(self, items, atr=(), indentText=False, allAsText=False, allAsIs=False):
         """ adds an unordered list to the section
 
         Parameters:
@@ -250,30 +287,33 @@ class Section:
         Returns: html code equivalent of the section
         """
 
-        doc, tag, text = yattag.Doc().tagtext()
-
-        with tag("section"):
-            # if id is not provided in atr, add it
-            if 'id' not in [x[0] for x in self.atr]:
-                self.atr.append(('id', self.id))
-            doc.asis(heading(self.title, self.level, atr=self.atr, indentText=self.indentText))
-                                 
-            for item in self.htmlCode:
-                if isinstance(item, str):
-                    # treat as html generated text already
-                    doc.asis(item)
-                else:
-                    # assume this is a class from this module, use generateHtml method
-                    doc.asis(item.generateHtml())
+        return ''.join(self.iterHtml())
 
-        result = yattag.indent(
-        doc.getvalue(),
-        indent_text = self.indentText
-        )
+    def iterHtml(self):
+        """ Generates the section html code in chunks, without indentation
+
+        Returns: generator of html code strings which together make up the section
+        """
 
-        return result
+        yield "<section>"
+        # if id is not provided in atr, add it. self.atr is not modified so
+        # repeated calls give the same result
+        # atr may have been set directly, so convert it again
+        atr = _atrTuple(self.atr)
+        if not any(key == 'id' for key, _ in atr):
+            atr = atr + (('id', self.id),)
+        yield heading(self.title, self.level, atr=atr)
+
+        for item in self.htmlCode:
+            if isinstance(item, str):
+                # treat as html generated text already
+                yield item
+            else:
+                # assume this is a class from this module, use iterHtml method
+                yield from item.iterHtml()
+        yield "</section>"
 
-def heading(title, level=1, atr=[], indentText=False):
+def heading(title, level=1, atr=(), indentText=False):
     """Creates an html heading tag
     
     Parameters:
@@ -284,21 +324,20 @@ def heading(title, level=1, atr=[], indentText=False):
         - indentText (optional): yattag indent option, for text inside tags. Default is False
         """
 
-    doc, tag, text = yattag.Doc().tagtext()
+    return _headingCached(title, level, _atrTuple(atr), indentText)
 
-    tagType = 'h' + str(level)
+@functools.lru_cache(maxsize=4096, typed=True)
+def _headingCached(title, level, atr, indentText):
+    """ Cached implementation of heading, atr must be a tuple of tuples so it can be hashed """
 
-    with tag(tagType, *atr):
-        text(title)
-    
-    result = yattag.indent(
-        doc.getvalue(),
-        indent_text = indentText
-        )
+    result = f"<h{level}{_atrString(atr)}>{_escape(str(title), quote=False)}</h{level}>"
+
+    if indentText:
+        result = yattag.indent(result, indent_text = indentText)
 
     return result
 
-def hyperlink(link, textStr=None, newTab=True, atr=[], indentText=False):
+def hyperlink(link, textStr=None, newTab=True, atr=(), indentText=False):
     """ generates an html hyperlink
 
     Parameters:
@@ -315,26 +354,26 @@ def hyperlink(link, textStr=None, newTab=True, atr=[], indentText=False):
         - html code for the hyperlink
     """
 
-    atr = [('href', link)] + atr
-    if newTab:
-        if "target" not in [x[0] for x in atr]:
-            atr.append(('target', '_blank'))
+    return _hyperlinkCached(link, textStr, newTab, _atrTuple(atr), indentText)
+
+@functools.lru_cache(maxsize=4096, typed=True)
+def _hyperlinkCached(link, textStr, newTab, atr, indentText):
+    """ Cached implementation of hyperlink, atr must be a tuple of tuples so it can be hashed """
+
+    atr = (('href', link),) + atr
+    if newTab and not any(key == 'target' for key, _ in atr):
+        atr += (('target', '_blank'),)
     if textStr is None:
         textStr = link
-        
-    doc, tag, text = yattag.Doc().tagtext()
 
-    with tag('a', *atr):
-        text(textStr)
-    
-    result = yattag.indent(
-        doc.getvalue(),
-        indent_text = indentText
-        )
+    result = f"<a{_atrString(atr)}>{_escape(str(textStr), quote=False)}</a>"
+
+    if indentText:
+        result = yattag.indent(result, indent_text = indentText)
 
     return result
 
-def orderedList(items, atr=[], indentText=False, allAsText=False, allAsIs=False):
+def orderedList(items, atr=(), indentText=False, allAsText=False, allAsIs=False):
     """ generates an html ordered list
 
     Parameters:
@@ -356,7 +395,94 @@ def orderedList(items, atr=[], indentText=False, allAsText=False, allAsIs=False)
         
     doc, tag, text = yattag.Doc().tagtext()
 
-    with tag('ol', *atr):
+    # nested lists are written to the same doc, so the list is only indented once
+    _writeList(doc, tag, text, 'ol', items, _atrTuple(atr), allAsText, allAsIs)
+
+    result = yattag.indent(
+        doc.getvalue(),
+        indent_text = indentText
+        )
+
+    return result
+      
+def paragraph(textStr, atr=(), indentText=False, allAsText=False, allAsIs=False, keepTags=None):
+    """ Generates an html paragraph
+    
+    Parameters:
+        - textStr: paragraph text
+        - atr (optional): list of tuples. Each item is a name-value pair which is added as an atribute
+            to the heading. For example ["style", "text-align:center"] would add a style attribute
+        - indentText (optional): yattag indent option, for text inside tags. Default is False
+        - allAsText (optional): if True, all special characters in textStr will be escaped, 
+            including html tags. Default is False
+        - allAsIs (optional): if True, no special characters in textStr will be escaped
+            Default is False
+        - keepTags (optional): list of html tags to allow in textStr. This is only used if 
+            allAsText and allAsIs are both False. If None (default), this includes all html tags
+            which are allowed inside a paragraph tag according to the HTML specification.
+            
+    Returns:
+        html code for the paragraph
+    """
+
+    if allAsText and allAsIs:
+        raise ValueError("allAsText and allAsIs cannot both be True")
+
+    atr = _atrTuple(atr)
+    if allAsText or allAsIs or '<' not in textStr:
+        # no tag splitting needed (without tags this is the same as allAsText), so the
+        # result only depends on hashable inputs. Only short text is cached, so large
+        # paragraphs are not kept in memory
+        if len(textStr) <= _PARAGRAPH_CACHE_MAX_LEN:
+            return _plainParagraphCached(textStr, atr, indentText, not allAsIs)
+        return _plainParagraph(textStr, atr, indentText, not allAsIs)
+
+    if keepTags is None:
+        keepTags = _DEFAULT_KEEP_TAGS
+    else:
+        keepTags = frozenset(tag.lower() for tag in keepTags)
+    subTexts, subTypes = spitTags(textStr, keepTags)
+    return _paragraphHtml(subTexts, subTypes, atr, indentText)
+
+def _plainParagraph(textStr, atr, indentText, allAsText):
+    """ Implementation of paragraph for the allAsText and allAsIs cases,
+        atr must be a tuple of tuples so it can be hashed by _plainParagraphCached
+    """
+
+    # the whole text is one part, so format it directly rather than via _paragraphHtml
+    if allAsText:
+        textStr = _escape(textStr, quote=False)
+    result = f"<p{_atrString(atr)}>{textStr}</p>"
+
+    if indentText:
+        result = yattag.indent(result, indent_text = indentText)
+
+    return result
+
+_plainParagraphCached = functools.lru_cache(maxsize=4096, typed=True)(_plainParagraph)
+
+def _paragraphHtml(subTexts, subTypes, atr, indentText):
+    """ Builds the html paragraph from text split into tag and text parts, see spitTags """
+
+    content = ''.join(_escape(subText, quote=False) if subType == 'text' else subText
+                      for subText, subType in zip(subTexts, subTypes))
+    result = f"<p{_atrString(atr)}>{content}</p>"
+
+    if indentText:
+        result = yattag.indent(result, indent_text = indentText)
+
+    return result
+
+def _writeList(doc, tag, text, listTag, items, atr, allAsText, allAsIs):
+    """ Helper function to write an html list, and any nested lists, to a yattag doc
+
+    Parameters:
+        - doc, tag, text: from yattag.Doc().tagtext()
+        - listTag: 'ol' or 'ul', used for this list and any nested lists
+        - items, atr, allAsText, allAsIs: see orderedList
+    """
+
+    with tag(listTag, *atr):
         iii = 0
         while iii < len(items):
             with tag('li'):
@@ -378,75 +504,106 @@ def orderedList(items, atr=[], indentText=False, allAsText=False, allAsIs=False)
                             doc.asis(subTexts[jjj])
 
                     if iii + 1 < len(items) and isinstance(items[iii + 1], list):
-                        # this is a nested list, call orderedList recursively
-                        doc.asis(orderedList(items[iii + 1], indentText=indentText, allAsText=allAsText, allAsIs=allAsIs))
+                        # this is a nested list, call _writeList recursively
+                        _writeList(doc, tag, text, listTag, items[iii + 1], (), allAsText, allAsIs)
                         iii += 1
                     iii += 1
                 else:
                     raise TypeError("List items must be strings or lists")
-            
-    result = yattag.indent(
-        doc.getvalue(),
-        indent_text = indentText
-        )
 
-    return result
-      
-def paragraph(textStr, atr=[], indentText=False, allAsText=False, allAsIs=False,
-              keepTags=['a', 'abbr', 'area', 'audio', 'b', 'bdi', 'bdo', 'br',
-                        'button', 'canvas', 'cite', 'code', 'data', 'datalist', 
-                        'del', 'dfn', 'em', 'embed', 'i', 'iframe', 'img', 'input',
-                        'ins', 'kbd', 'label', 'link', 'map', 'mark', 'math', 'meta',
-                        'meter', 'noscript', 'object', 'output', 'picture', 'progress', 
-                        'q', 'ruby', 's', 'samp', 'script', 'select', 'slot', 'small', 
-                        'span', 'strong', 'sub', 'sup', 'SVG svg', 'template', 'text',
-                        'textarea', 'time', 'u', 'var', 'video', 'wbr'],
-            ):
-    """ Generates an html paragraph
-    
+def _indentBodyItem(code, indentText):
+    """ Helper function to indent html code as if it were inside the body of a document
+
     Parameters:
-        - textStr: paragraph text
-        - atr (optional): list of tuples. Each item is a name-value pair which is added as an atribute
-            to the heading. For example ["style", "text-align:center"] would add a style attribute
-        - indentText (optional): yattag indent option, for text inside tags. Default is False
-        - allAsText (optional): if True, all special characters in textStr will be escaped, 
-            including html tags. Default is False
-        - allAsIs (optional): if True, no special characters in textStr will be escaped
-            Default is False
-        - keepTags (optional): list of html tags to allow in textStr. This is only used if 
-            allAsText and allAsIs are both False. By default, this includes all html tags
-            which are allowed inside a paragraph tag according to the HTML specification.
-            
+        - code: html code of one body item
+        - indentText: yattag indent option, for text inside tags
+
     Returns:
-        html code for the paragraph
+        - indented html code, without leading or trailing newline. Empty if there is no code
     """
-    
-    doc, tag, text = yattag.Doc().tagtext()
 
-    if allAsText and allAsIs:
-        raise ValueError("allAsText and allAsIs cannot both be True")
-    if allAsText:
-        subTexts = [textStr]
-        subTypes = ['text']
-    elif allAsIs:
-        subTexts = [textStr]
-        subTypes = ['tag']
+    # indent inside html and body tags, then remove those tags. The body tags are
+    # on their own lines unless yattag keeps the code inline, e.g. if it starts with text
+    lines = yattag.indent('<html><body>' + code + '</body></html>', indent_text = indentText).split('\n')
+    inner = '\n'.join(lines[1:-1])
+    inner = inner[len('  <body>') : -len('</body>')]
+    if inner.startswith('\n'):
+        # code is on its own lines, remove the newline after <body> and the indent before </body>
+        return inner[1 : -len('\n  ')]
+    elif inner:
+        # code was kept on the body line, put it on its own line instead
+        return '    ' + inner
     else:
-        subTexts, subTypes = spitTags(textStr, keepTags)
+        return ''
 
-    with tag('p', *atr):
-        for iii in range(0, len(subTexts)):
-            if subTypes[iii] == 'text':
-                text(subTexts[iii])
-            else:
-                doc.asis(subTexts[iii])
+def _atrTuple(atr):
+    """ Helper function to convert a list of attribute name-value pairs into a
+        tuple of tuples. This is immutable, so can be shared and used as a cache key.
+        Values are converted to strings as they will be written, so equal values of
+        different types (e.g. 1 and True) give different keys
+    """
+    return tuple((key, str(value)) for key, value in atr)
+
+def _atrString(atr):
+    """ Helper function to format html attributes for a start tag, escaping the values
+
+    Parameters:
+        - atr: list of tuples. Each item is a name-value pair which is formatted as an atribute
     
-    result = yattag.indent(
-        doc.getvalue(),
-        indent_text = indentText
-        )
+    Returns:
+        - attribute text, with a leading space before each attribute
+    """
+    return ''.join(f' {key}="{_escape(str(value), quote=True)}"' for key, value in atr)
 
-    return result
+def _findTags(text):
+    """ Helper function to find all start and end tags in text, in order
+
+    Parameters:
+        - text: the text to search
+
+    Returns:
+        - foundItem: list of lowercase tag names
+        - foundType: list of 'start', 'end' or 'startend' (for tags ending in "/>")
+        - startInds: list of the index in text where each tag starts
+        - endInds: list of the index in text after each tag ends
+    """
+    foundItem = []
+    foundType = []
+    startInds = []
+    endInds = []
+    pos = 0
+    # raw text tags with no end tag after the current position. Once a search fails it
+    # would fail again from any later position, so each tag is searched to the end at most once
+    noEndTag = set()
+    match = _TAG_RE.search(text, pos)
+    while match is not None:
+        tag = match.group(2).lower()
+        foundItem.append(tag)
+        if match.group(1):
+            foundType.append('end')
+        elif match.group(0).endswith('/>'):
+            foundType.append('startend')
+        else:
+            foundType.append('start')
+        startInds.append(match.start())
+        endInds.append(match.end())
+        pos = match.end()
+
+        if foundType[-1] == 'start' and tag in _RAW_TEXT_END_RE and not tag in noEndTag:
+            # content is not html, so jump straight to the end tag rather than looking for tags in it
+            endMatch = _RAW_TEXT_END_RE[tag].search(text, pos)
+            if endMatch is None:
+                noEndTag.add(tag)
+            else:
+                foundItem.append(tag)
+                foundType.append('end')
+                startInds.append(endMatch.start())
+                endInds.append(endMatch.end())
+                pos = endMatch.end()
+
+        match = _TAG_RE.search(text, pos)
+
+    return foundItem, foundType, startInds, endInds
 
 def spitTags(text, tags=None):
     """ Helper function to split text into parts that are tags and parts that are not tags.
@@ -455,113 +612,64 @@ def spitTags(text, tags=None):
 
     Parameters:
         - text: the text to be split
-        - tags (optional): list of tags to be split out. If None, all tags identified.
+        - tags (optional): collection of lowercase tag names to be split out. If None, all tags identified.
     
     Returns:
         - subTexts: list of text parts, including tags and non-tags
         - subTypes: list of same length as subTexts, with values 'tag' or
             'text' to indicate whether the corresponding item in subTexts is a tag or not
     """
-    # create parser to find tags and their locations in the text
-    class MyHTMLParser(HTMLParser):
-        def __init__(self):
-            super().__init__()
-            self.foundItem = []
-            self.startInds = []
-            self.foundType = []
-        def handle_starttag(self, tag, attrs):
-            self.foundItem.append(tag)
-            self.startInds.append(self.getpos())
-            self.foundType.append("start")
-        def handle_endtag(self, tag):
-            self.foundItem.append(tag)
-            self.startInds.append(self.getpos())
-            self.foundType.append("end")
-        def handle_data(self, data):
-            self.foundItem.append(data)
-            self.startInds.append(self.getpos())
-            self.foundType.append("data")
-
-
-    parser = MyHTMLParser()
-    parser.feed(text)
-    # parser shows line and index of the tag, but we want index in the whole string, 
-    # so we need to convert
-    lines = text.split('\n')
-    startInds = parser.startInds
-    startInds = [sum([len(x) - 1 for x in lines[0 : start[0] - 1]]) + # passed lines
-                 2 * (start[0]-1) + # newlines in passed lines
-                 start[1] for start in startInds] # index in line
-    # extract information about tags found by parser
-    foundItem = parser.foundItem
-    foundType = parser.foundType
+    # find all start and end tags and their locations in the text in one pass
+    foundItem, foundType, startInds, endInds = _findTags(text)
+    # pair each start tag with its end tag in one pass, nested tags with the same
+    # name are closed first. endPair[iii] is the index of the end tag, or None
+    endPair = [None] * len(foundItem)
+    openTags = {} # tag name to list of indices of start tags not closed yet
+    for iii in range(0, len(foundItem)):
+        if foundType[iii] == 'start' and not foundItem[iii] in _SELF_CLOSING:
+            openTags.setdefault(foundItem[iii], []).append(iii)
+        elif foundType[iii] == 'end' and openTags.get(foundItem[iii]):
+            endPair[openTags[foundItem[iii]].pop()] = iii
     # check if tags found are in search list
     subTexts = []
     subTypes = []
-    subStartInds = []
-    subEndInds = []
+    cursor = 0 # index in text after the last tag added to subTexts
     iii = 0
     while iii < len(foundItem):
-        if foundType[iii] == 'start':
-            if not tags is None and not foundItem[iii] in tags:
-                # tags provided and this tag is not in the list, treat as text
-                iii += 1
-                continue
-
-            if len(subEndInds) == 0 and startInds[iii] > 0:
-                # if this is the first tag found and there is text before it, add that text to subTexts and subTypes
-                subTexts.append(text[0 : startInds[iii]])
-                subTypes.append('text')
-                subStartInds.append(0)
-                subEndInds.append(startInds[iii] - 1)
-            elif not subEndInds[-1] == startInds[iii] - 1:
-                # if there is text between the end of the last tag and the start of this tag, add that text to subTexts and subTypes
-                subTexts.append(text[subEndInds[-1] + 1 : startInds[iii]])
-                subTypes.append('text')
-                subStartInds.append(subEndInds[-1] + 1)
-                subEndInds.append(startInds[iii] - 1)
-
-            if foundItem[iii] in selfClosingTags:
-                # no end tag, just add to subTexts and subTypes
-                startInd = startInds[iii]
-                if iii + 1 < len(startInds):
-                    endInd = startInds[iii + 1]
-                else:
-                    endInd = len(text)
-                subTexts.append(text[startInd : endInd])
-                subTypes.append('tag')
-                subStartInds.append(startInd)
-                subEndInds.append(endInd - 1)
-            else:
-                # find corresponding end tag
-                tag = foundItem[iii]
-                startInd = startInds[iii]
-                iii += 1
-                while not (foundItem[iii] == tag and foundType[iii] == 'end'):
-                    iii += 1
-                if iii + 1 < len(startInds):
-                    endInd = startInds[iii + 1]
-                else:
-                    endInd = len(text)
-                subTexts.append(text[startInd : endInd])
-                subTypes.append('tag')
-                subStartInds.append(startInd)
-                subEndInds.append(endInd - 1)
+        tag = foundItem[iii]
+        if foundType[iii] == 'end' or (not tags is None and not tag in tags):
+            # end tag without a start tag, or tags provided and this tag is not in the list, treat as text
+            iii += 1
+            continue
+
+        startInd = startInds[iii]
+        if startInd > cursor:
+            # if there is text between the end of the last tag and the start of this tag, add that text to subTexts and subTypes
+            subTexts.append(text[cursor : startInd])
+            subTypes.append('text')
+
+        endInd = endInds[iii]
+        if endPair[iii] is not None:
+            # include everything up to the corresponding end tag.
+            # if there is none just keep the start tag
+            iii = endPair[iii]
+            endInd = endInds[iii]
+        subTexts.append(text[startInd : endInd])
+        subTypes.append('tag')
+        cursor = endInd
         iii += 1
-    if len(subStartInds) == 0:
+    if len(subTexts) == 0:
         # if no tags found, return original text as one item in subTexts and subTypes
         subTexts.append(text)
         subTypes.append('text')
-    elif len(subEndInds) > 0 and subEndInds[-1] < len(text) - 1:
+    elif cursor < len(text):
         # check for text after the last tag
-        subTexts.append(text[subEndInds[-1] + 1 :])
+        subTexts.append(text[cursor :])
         subTypes.append('text')
-        subStartInds.append(subEndInds[-1] + 1)
-        subEndInds.append(len(text) - 1)
 
     return subTexts, subTypes
 
-def unorderedList(items, atr=[], indentText=False, allAsText=False, allAsIs=False):
+def unorderedList(items, atr=(), indentText=False, allAsText=False, allAsIs=False):
     """ generates an html unorderedList list
 
     Parameters:
@@ -583,35 +691,9 @@ def unorderedList(items, atr=[], indentText=False, allAsText=False, allAsIs=Fals
         
     doc, tag, text = yattag.Doc().tagtext()
 
-    with tag('ul', *atr):
-        iii = 0
-        while iii < len(items):
-            with tag('li'):
-                if isinstance(items[iii], str):
-                    # this is a list item, check if we need to split into text vs tags
-                    if allAsText:
-                        subTexts = [items[iii]]
-                        subTypes = ['text']
-                    elif allAsIs:
-                        subTexts = [items[iii]]
-                        subTypes = ['tag']
-                    else:
-                        subTexts, subTypes = spitTags(items[iii])
+    # nested lists are written to the same doc, so the list is only indented once
+    _writeList(doc, tag, text, 'ul', items, _atrTuple(atr), allAsText, allAsIs)
 
-                    for jjj in range(0, len(subTexts)):
-                        if subTypes[jjj] == 'text':
-                            text(subTexts[jjj])
-                        else:
-                            doc.asis(subTexts[jjj])
-
-                    if iii + 1 < len(items) and isinstance(items[iii + 1], list):
-                        # this is a nested list, call orderedList recursively
-                        doc.asis(unorderedList(items[iii + 1], indentText=indentText, allAsText=allAsText, allAsIs=allAsIs))
-                        iii += 1
-                    iii += 1
-                else:
-                    raise TypeError("List items must be strings or lists")
-            
     result = yattag.indent(
         doc.getvalue(),
         indent_text = indentText
@@ -0,0 +1,157 @@
+""" Tests for htmlDoc, run with python -m unittest """
+import os
+import tempfile
+import time
+import unittest
+
+import htmlDoc
+
+
+def scalingRatio(function, makeInput, n):
+    """ Returns how much longer function takes for an input of size 4n than size n.
+        About 4 for linear time, about 16 for quadratic time
+    """
+    times = []
+    for size in (n, 4 * n):
+        text = makeInput(size)
+        # best of several runs, to reduce noise from other processes
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            function(text)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times.append(best)
+    return times[1] / times[0]
+
+
+class TestSpitTags(unittest.TestCase):
+
+    def test_scriptContentIsNotSplit(self):
+        # "<" inside a script is not the start of a tag, the whole script is kept as is
+        result = htmlDoc.paragraph('x <script>if(a<b){}</script> y')
+        self.assertEqual(result, '<p>x <script>if(a<b){}</script> y</p>')
+
+    def test_unclosedTagsScanInLinearTime(self):
+        subTexts, subTypes = htmlDoc.spitTags('x <b x ' * 4000)
+        self.assertEqual(subTexts, ['x <b x ' * 4000])
+        self.assertEqual(subTypes, ['text'])
+        self.assertLess(scalingRatio(htmlDoc.spitTags, lambda n: 'x <b x ' * n, 2000), 10)
+
+    def test_rawTextTagsWithoutEndTagInLinearTime(self):
+        subTexts, subTypes = htmlDoc.spitTags('<script>' * 3)
+        self.assertEqual(subTexts, ['<script>'] * 3)
+        self.assertLess(scalingRatio(htmlDoc.spitTags, lambda n: '<script>' * n, 2000), 10)
+        self.assertLess(scalingRatio(htmlDoc.paragraph, lambda n: 'x<textarea>' * n, 2000), 10)
+
+    def test_nestedTagsWithSameName(self):
+        subTexts, subTypes = htmlDoc.spitTags('<span>a<span>b</span>c</span> tail')
+        self.assertEqual(subTexts, ['<span>a<span>b</span>c</span>', ' tail'])
+        self.assertEqual(subTypes, ['tag', 'text'])
+
+    def test_startTagsWithoutEndTagInLinearTime(self):
+        subTexts, subTypes = htmlDoc.spitTags('<b>' * 4000)
+        self.assertEqual(subTexts, ['<b>'] * 4000)
+        self.assertLess(scalingRatio(htmlDoc.spitTags, lambda n: '<b>' * n, 2000), 10)
+
+
+class TestCachedHelpers(unittest.TestCase):
+
+    def test_equalKeysOfDifferentTypesAreNotShared(self):
+        self.assertEqual(htmlDoc.heading(1), '<h1>1</h1>')
+        self.assertEqual(htmlDoc.heading(True), '<h1>True</h1>')
+
+    def test_attributeValuesOfDifferentTypesAreNotShared(self):
+        self.assertEqual(htmlDoc.heading('x', 1, [('data-k', 1)]), '<h1 data-k="1">x</h1>')
+        self.assertEqual(htmlDoc.heading('x', 1, [('data-k', True)]), '<h1 data-k="True">x</h1>')
+        self.assertEqual(htmlDoc.paragraph('x', [('data-k', 1)]), '<p data-k="1">x</p>')
+        self.assertEqual(htmlDoc.paragraph('x', [('data-k', 1.0)]), '<p data-k="1.0">x</p>')
+        self.assertEqual(htmlDoc.hyperlink('l', 'x', False, [('data-k', 0)]),
+                         '<a href="l" data-k="0">x</a>')
+        self.assertEqual(htmlDoc.hyperlink('l', 'x', False, [('data-k', False)]),
+                         '<a href="l" data-k="False">x</a>')
+
+    def test_longParagraphsAreNotCached(self):
+        htmlDoc._plainParagraphCached.cache_clear()
+        htmlDoc.paragraph('a' * (htmlDoc._PARAGRAPH_CACHE_MAX_LEN + 1))
+        self.assertEqual(htmlDoc._plainParagraphCached.cache_info().currsize, 0)
+        htmlDoc.paragraph('short')
+        self.assertEqual(htmlDoc._plainParagraphCached.cache_info().currsize, 1)
+
+
+class TestHtmlDoc(unittest.TestCase):
+
+    def makeDoc(self, indentText):
+        doc = htmlDoc.HtmlDoc('Title', indentText=indentText)
+        doc.addText('intro <b>bold</b>')
+        section = doc.addSection('Section', level=2)
+        section.addText('text')
+        section.addSubsection('Subsection').addOrderedList(['a', ['b']])
+        return doc
+
+    def test_saveFileMatchesGenerateHtml(self):
+        for indentText in (False, True):
+            doc = self.makeDoc(indentText)
+            with tempfile.TemporaryDirectory() as folder:
+                filename = os.path.join(folder, 'doc.html')
+                doc.saveFile(filename)
+                with open(filename, encoding='utf-8') as f:
+                    self.assertEqual(f.read(), doc.generateHtml())
+
+    def test_bodyItemsStartingWithTextAreKept(self):
+        for indentText in (False, True):
+            doc = htmlDoc.HtmlDoc('Title', indentText=indentText)
+            doc.bodyItems.append('raw text item')
+            doc.bodyItems.append('hello <b>x</b>')
+            doc.bodyItems.append('')
+            html = doc.generateHtml()
+            self.assertIn('raw text item', html)
+            self.assertIn('hello', html)
+            self.assertIn('<b>', html)
+            self.assertNotIn('\n\n', html)
+
+    def test_generateHtmlIsIndented(self):
+        lines = self.makeDoc(False).generateHtml().split('\n')
+        self.assertEqual(lines[0], '<!DOCTYPE html>')
+        self.assertIn('    <h1>Title</h1>', lines)
+        self.assertIn('        <h3 id="Subsection">Subsection</h3>', lines)
+
+
+class TestSection(unittest.TestCase):
+
+    def test_changesAfterRenderingAreShown(self):
+        doc = htmlDoc.HtmlDoc('Title')
+        section = doc.addSection('Section', id='sec')
+        subsection = section.addSubsection('Subsection')
+        section.generateHtml()
+        doc.generateHtml()
+
+        section.title = 'CHANGED'
+        self.assertIn('CHANGED', section.generateHtml())
+        self.assertIn('CHANGED', doc.generateHtml())
+
+        section.htmlCode.append('<p>appended</p>')
+        self.assertIn('appended', doc.generateHtml())
+
+        subsection.addText('subsection text')
+        self.assertIn('subsection text', section.generateHtml())
+
+        # a section added to htmlCode by hand, rather than with addSubsection
+        manual = htmlDoc.Section('Manual', level=2)
+        section.htmlCode.append(manual)
+        section.generateHtml()
+        manual.addText('manual text')
+        self.assertIn('manual text', section.generateHtml())
+        self.assertIn('manual text', doc.generateHtml())
+
+    def test_atrSetToListIsShown(self):
+        doc = htmlDoc.HtmlDoc('Title')
+        section = doc.addSection('Section')
+        section.atr = [('class', 'a')]
+        doc.generateHtml()
+        section.atr.append(('title', 'mutated'))
+        self.assertIn('<h1 class="a" title="mutated" id="Section">', doc.generateHtml())
+
+
+if __name__ == "__main__":
+    unittest.main()